@@ -2,9 +2,65 @@
 
 import random
 from datetime import datetime
+from itertools import count
 
 from move import Move
-from piece import Piece
+from piece import EMPTY_PIECE, Piece
+
+# Numbers given to each game played on any board
+GAME_NUMBERS = count()
+
+# Squares each piece can leap to and squares along each direction it can
+# ride in from each square, for each board size, found when first needed
+RAYS = {}
+
+
+def get_rays(piece, x: int, y: int, size: tuple) -> tuple:
+    """
+    Return the squares a piece can reach on an empty board.
+
+    Pieces which only leap cannot be blocked, so their squares are
+    returned in one tuple which is not split by direction.
+
+    Parameters
+    ----------
+    piece : Piece
+        Piece to move.
+    x, y : int
+        Coordinates of the square of the piece.
+    size : tuple of (int, int)
+        Number of columns and rows of the board.
+
+    Returns
+    -------
+    tuple of (int, int, str), tuple of tuple of (int, int, str)
+        Coordinates and algebraic notation of the squares the piece can
+        leap to if it only leaps, and of the squares along each
+        direction the piece can move in otherwise, in order from the
+        piece until the edge of the board or the range of the piece.
+    """
+    key = size, piece.notation, x, y
+    rays = RAYS.get(key)
+    if rays is None:
+        rays = []
+        for dx, dy, maximum in piece.offsets:
+            ray = []
+            nx = x
+            ny = y
+            for _ in range(min(max(size), maximum)):
+                nx += dx
+                ny += dy
+                if not (0 <= nx < size[0] and 0 <= ny < size[1]):
+                    break
+                ray.append((nx, ny, f'{chr(97+nx)}{size[1]-ny}'))
+            if ray:
+                rays.append(tuple(ray))
+        if all(maximum == 1 for *_, maximum in piece.offsets):
+            rays = tuple(square for ray in rays for square in ray), ()
+        else:
+            rays = (), tuple(rays)
+        RAYS[key] = rays
+    return rays
 
 
 class Board:
@@ -43,8 +99,20 @@ class Board:
         Moves played on the board.
     undone_moves : list of Move
         Moves that have been undone in order. Used to redo moves.
+    moved : dict of {(int, int): tuple of (int, float)}
+        Number of moves played and distance travelled in squares by the
+        piece on each square, for pieces which have moved. Pieces are
+        shared between squares, so this is tracked by the board.
+    moved_history : list of dict
+        `moved` before each move played. Used to undo moves.
     legal_moves : list of Move
         All legal moves of the current position.
+    legal_from : dict of {(int, int): list of Move}
+        Legal moves grouped by the coordinates of their starting square.
+        Rebuilt whenever `legal_moves` is set.
+    legal_coords : dict of {(int, int, int, int): list of Move}
+        Legal moves grouped by the coordinates of their starting and
+        ending squares. Rebuilt whenever `legal_moves` is set.
     illegal_moves : list of Move
         All illegal moves of the current position due to king in check.
     promotion : str
@@ -53,6 +121,18 @@ class Board:
         Computer evaluation of the position. Infinity for checkmate.
         Integer type means moves until mate. Positive for white
         advantage, negative for black advantage, 0 for draw.
+    game : int
+        Number of the game, different for every game played on any
+        board. Changed whenever the board is reset.
+    version : int
+        Incremented whenever the position changes.
+    fen_cache : tuple of (int, str)
+        Version and piece placement of the last FEN generated, reused
+        while the position is unchanged.
+    uci_cache : tuple of (list of Move or None, dict of {str: Move})
+        Legal moves and the same moves given their UCI notation, found
+        by computer.uci_moves and reused while the legal moves are
+        unchanged.
 
     Raises
     ------
@@ -92,13 +172,13 @@ class Board:
                 y = 8
                 variant = 'Standard'
             self.size = size = 8, y
-            self.board = [[Piece()] * size[0] for _ in range(size[1])]
+            self.board = [[EMPTY_PIECE] * size[0] for _ in range(size[1])]
 
         # [backrank pieces]
         elif len(variant) > 2 and variant[0] == '[' and variant[-1] == ']':
             pieces = variant[1:-1]
             self.size = size = len(pieces), 8
-            self.board = [[Piece()] * size[0] for _ in range(size[1])]
+            self.board = [[EMPTY_PIECE] * size[0] for _ in range(size[1])]
             self.board[0] = [Piece(piece) for piece in pieces.lower()]
             self.board[1] = [Piece('p') for _ in range(size[0])]
             self.board[-2] = [Piece('P') for _ in range(size[0])]
@@ -145,7 +225,7 @@ class Board:
         """Resets board to empty 8x8."""
         self.variant = 'Empty'
         self.size = size = 8, 8
-        self.board = [[Piece()] * size[0] for _ in range(size[1])]
+        self.board = [[EMPTY_PIECE] * size[0] for _ in range(size[1])]
         self.active = 'w'
         self.castling = 'KQkq'
         self.en_passant = '-'
@@ -167,11 +247,34 @@ class Board:
         }
         self.moves = []
         self.undone_moves = []
+        self.moved = {}
+        self.moved_history = []
+        self.game = next(GAME_NUMBERS)
+        self.version = 0
+        self.fen_cache = (-1, '')
+        self.uci_cache = (None, {})
         self.legal_moves = []
         self.illegal_moves = []
         self.promotion = 'QNRB'
         self.evaluation = 0.0
 
+    @property
+    def legal_moves(self) -> list:
+        """All legal moves of the current position."""
+        return self._legal_moves
+
+    @legal_moves.setter
+    def legal_moves(self, moves: list):
+        self._legal_moves = moves
+        self.version += 1
+        # Index moves by coordinates for constant time lookups
+        self.legal_from = {}
+        self.legal_coords = {}
+        for move in moves:
+            self.legal_from.setdefault((move.x, move.y), []).append(move)
+            self.legal_coords.setdefault(
+                (move.x, move.y, move.nx, move.ny), []).append(move)
+
     def move(self, move, *, update_moves: bool = True):
         """
         Play move on the board.
@@ -202,16 +305,17 @@ class Board:
                 piece = 'P'
 
             for legal_move in self.legal_moves:
-                if move == legal_move:
+                if legal_move.name == move:
                     move = legal_move
                     break
             else:
                 raise ChessError
         elif isinstance(move, Move):
-            piece = self.board[move.y][move.x].letter.upper()
+            piece = self.board[move.y][move.x].notation
         else:
             raise TypeError
 
+        self.version += 1
         board = self.board
         active = self.active
         name = move.name
@@ -220,26 +324,34 @@ class Board:
         nx = move.nx
         ny = move.ny
         capture = move.capture
-        board[y][x].moves += 1
-        board[y][x].distance += move.distance
         self.moves.append(move)
 
+        # Update moves and distance of the moving piece
+        self.moved_history.append(self.moved)
+        self.moved = moved = self.moved.copy()
+        moves, distance = moved.pop((x, y), (0, 0))
+        moved[nx, ny] = moves + 1, distance + move.distance
+
         # Castle
         if '-' in name:
             rx = move.info[0]
             king = board[y][x]
             rook = board[y][rx]
-            board[y][x] = Piece()
-            board[y][rx] = Piece()
+            board[y][x] = EMPTY_PIECE
+            board[y][rx] = EMPTY_PIECE
             board[y][nx] = king
             nrx = nx + (name.count('0') == 3) * 2 - 1
-            rook.distance += abs(nrx - rx)
+            # Rook keeps its number of moves
+            rook_moves, distance = self.moved_history[-1].get((rx, y), (0, 0))
+            if rx != nx:
+                moved.pop((rx, y), None)
+            moved[nrx, y] = rook_moves, distance + abs(nrx - rx)
             board[y][nrx] = rook
 
         # Move piece
         else:
             board[ny][nx] = board[y][x]
-            board[y][x] = Piece()
+            board[y][x] = EMPTY_PIECE
 
         if piece == 'P':
             # Promotion
@@ -247,11 +359,7 @@ class Board:
                 promote = name[name.index('=') + 1]
                 if board[ny][nx].colour == 'b':
                     promote = promote.lower()
-                moves = board[ny][nx].moves
-                distance = board[ny][nx].distance
                 board[ny][nx] = Piece(promote)
-                board[ny][nx].moves = moves
-                board[ny][nx].distance = distance
 
             # En passant
             if abs(y-ny) == 2:
@@ -260,7 +368,8 @@ class Board:
                 self.en_passant = f'{file}{rank}'
             else:
                 if move.info:
-                    board[y][nx] = Piece()
+                    board[y][nx] = EMPTY_PIECE
+                    moved.pop((nx, y), None)
                 self.en_passant = '-'
         else:
             self.en_passant = '-'
@@ -279,7 +388,7 @@ class Board:
             # Moving king or rook
             if piece == 'K':
                 replace = k, q
-            elif piece == 'R' and board[ny][nx].moves == 1:
+            elif piece == 'R' and moved[nx, ny][0] == 1:
                 for kx in range(self.size[0]):
                     if board[y][kx].letter == k:
                         if x > kx:
@@ -287,7 +396,8 @@ class Board:
                         else:
                             replace = q
 
-            elif capture and not capture.moves:
+            elif (capture and
+                    not self.moved_history[-1].get((nx, ny), (0, 0))[0]):
                 if capture.colour == 'w':
                     k = 'K'
                     q = 'Q'
@@ -305,11 +415,11 @@ class Board:
                         if board[ny][kx].letter == k:
                             if kx > nx:
                                 if all(board[ny][rx].letter != r or
-                                       board[ny][rx].moves
+                                       self.piece_moves(rx, ny)
                                        for rx in range(kx)):
                                     replace = q
                             elif all(board[ny][rx].letter != r or
-                                     board[ny][rx].moves
+                                     self.piece_moves(rx, ny)
                                      for rx in range(kx+1, self.size[0])):
                                 replace = k
                             break
@@ -364,6 +474,10 @@ class Board:
 
             self.legal_moves = self.get_moves()
 
+    def piece_moves(self, x: int, y: int) -> int:
+        """Return number of moves played by the piece at (x, y)."""
+        return self.moved.get((x, y), (0, 0))[0]
+
     def get_moves(self, *, depth: float = 3) -> list:
         """
         Get all moves of the current position of the game.
@@ -390,15 +504,18 @@ class Board:
 
         board = self.board
         hash = self.get_hash()
+        state = (self.active, self.castling, self.en_passant, self.halfmove,
+                 self.fullmove, self.evaluation)
         size = self.size
+        colour = self.active
         moves = {}
 
         for y in range(size[1]):
             for x in range(size[0]):
                 piece = board[y][x]
-                letter = piece.letter.upper()
-                if self.active != piece.colour:
+                if colour != piece.colour:
                     continue
+                letter = piece.notation
                 if letter in {'\u0391', '\u0392', '\u0393', '\u0394'}:
                     continue
 
@@ -416,11 +533,12 @@ class Board:
                             # Promotion
                             for end in self.promotion:
                                 move = f'{file}{rank}={end}'
-                                moves[move] = [Move(move, x, y, x, ny, self,
+                                moves[move] = [Move(move, x, y, x, ny, state,
                                                     hash)]
                         else:
                             move = f'{file}{rank}'
-                            moves[move] = [Move(move, x, y, x, ny, self, hash)]
+                            moves[move] = [Move(move, x, y, x, ny, state,
+                                                hash)]
 
                         # Move pawn two squares forwards
                         if dy * y < (0, 2, 3-size[1])[dy]:
@@ -432,11 +550,11 @@ class Board:
                                     for end in self.promotion:
                                         move = f'{file}{rank}={end}'
                                         moves[move] = [Move(move, x, y, x, ny,
-                                                            self, hash)]
+                                                            state, hash)]
                                 else:
                                     move = f'{file}{rank}'
                                     moves[move] = [Move(move, x, y, x, ny,
-                                                        self, hash)]
+                                                        state, hash)]
 
                     # Pawn captures and en passant
                     ny = y + dy
@@ -465,12 +583,12 @@ class Board:
                             # Promotion
                             for end in self.promotion:
                                 move = f'{file}x{new_file}{rank}={end}'
-                                moves[move] = [Move(move, x, y, nx, ny, self,
+                                moves[move] = [Move(move, x, y, nx, ny, state,
                                                     hash, capture, info)]
                         else:
                             move = f'{file}x{new_file}{rank}'
-                            moves[move] = [Move(move, x, y, nx, ny, self, hash,
-                                                capture, info)]
+                            moves[move] = [Move(move, x, y, nx, ny, state,
+                                                hash, capture, info)]
                     continue
 
                 # Castle
@@ -490,8 +608,8 @@ class Board:
 
                         if side == k:
                             for rx in range(x+1, size[0]):
-                                square = board[y][rx]
-                                if square.letter == r and not square.moves:
+                                if (board[y][rx].letter == r and
+                                        not self.piece_moves(rx, y)):
                                     break
                             else:
                                 rx = size[0] - 1
@@ -499,8 +617,8 @@ class Board:
                             end = max(rx, size[0]-2)
                         else:
                             for rx in range(x-1, -1, -1):
-                                square = board[y][rx]
-                                if square.letter == r and not square.moves:
+                                if (board[y][rx].letter == r and
+                                        not self.piece_moves(rx, y)):
                                     break
                             start = min(rx, 2)
                             end = max(x, 3)
@@ -509,10 +627,13 @@ class Board:
                         rook = 0
                         castle = True
 
-                        for square in board[y][start:end+1]:
-                            if square.letter == k and not square.moves:
+                        for sx in range(start, end+1):
+                            square = board[y][sx]
+                            if (square.letter == k and
+                                    not self.piece_moves(sx, y)):
                                 king += 1
-                            elif square.letter == r and not square.moves:
+                            elif (square.letter == r and
+                                    not self.piece_moves(sx, y)):
                                 rook += 1
                             elif square:
                                 castle = False
@@ -521,67 +642,53 @@ class Board:
                         if castle and king == rook == 1:
                             if side == k:
                                 nx = size[0]-2
-                                moves['0-0'] = [Move('0-0', x, y, nx, y, self,
+                                moves['0-0'] = [Move('0-0', x, y, nx, y, state,
                                                      hash, info=(rx, y))]
                             else:
                                 moves['0-0-0'] = [Move('0-0-0', x, y, 2, y,
-                                    self, hash, info=(rx, y))]
+                                    state, hash, info=(rx, y))]
 
                 # Moves of symmetrically moving pieces
-                for move_x, move_y, maximum in piece.movement:
-                    maximum = min(max(size), maximum)
-                    # Rotate/reflect the movement vector in all 8 directions
-                    for direction in range(8):
-                        if direction % 2:
-                            if move_x == move_y:
-                                continue
-                            dx = move_y
-                            dy = move_x
-                        else:
-                            dx = move_x
-                            dy = move_y
-                        if direction // 2 % 2:
-                            if not dy:
-                                continue
-                            dy *= -1
-                        if direction // 4 % 2:
-                            if not dx:
-                                continue
-                            dx *= -1
-
-                        nx = x
-                        ny = y
-                        for _ in range(maximum):
-                            # Break if move takes piece off the board
-                            nx += dx
-                            if not 0 <= nx < size[0]:
-                                break
-                            ny += dy
-                            if not 0 <= ny < size[1]:
-                                break
+                leaps, rays = get_rays(piece, x, y, size)
 
-                            # Disallow capturing own piece
-                            destination = board[ny][nx]
-                            if piece.colour == destination.colour:
-                                break
-                            # Capturing opponent's piece
-                            if destination:
-                                if not destination.colour:
-                                    break
-                                middle = 'x'
-                                capture = board[ny][nx]
-                            else:
-                                middle = ''
-                                capture = None
-
-                            file = chr(97+nx)
-                            rank = size[1]-ny
-                            move = f'{letter}{middle}{file}{rank}'
-                            move = Move(move, x, y, nx, ny, self, hash,
-                                        capture)
-                            moves.setdefault(move.name, []).append(move)
-                            if capture:
-                                break
+                # Leap to each square not occupied by own piece
+                for nx, ny, square in leaps:
+                    destination = board[ny][nx]
+                    target = destination.colour
+                    if target == colour:
+                        continue
+                    if target:
+                        name = f'{letter}x{square}'
+                        moves.setdefault(name, []).append(
+                            Move(name, x, y, nx, ny, state, hash,
+                                 destination))
+                    elif destination.letter == ' ':
+                        name = letter + square
+                        moves.setdefault(name, []).append(
+                            Move(name, x, y, nx, ny, state, hash))
+
+                # Walk each direction until blocked
+                for ray in rays:
+                    for nx, ny, square in ray:
+                        destination = board[ny][nx]
+                        target = destination.colour
+                        # Disallow capturing own piece
+                        if target == colour:
+                            break
+                        # Capturing opponent's piece
+                        if target:
+                            name = f'{letter}x{square}'
+                            moves.setdefault(name, []).append(
+                                Move(name, x, y, nx, ny, state, hash,
+                                     destination))
+                            break
+                        # Blocked by a piece without a colour
+                        if destination.letter != ' ':
+                            break
+
+                        name = letter + square
+                        moves.setdefault(name, []).append(
+                            Move(name, x, y, nx, ny, state, hash))
 
         # Remove moves if illegal due to check
         if depth:
@@ -732,6 +839,7 @@ class Board:
         if not self.moves:
             return
 
+        self.version += 1
         board = self.board
         move = self.moves.pop()
         x = move.x
@@ -739,18 +847,16 @@ class Board:
         nx = move.nx
         ny = move.ny
         info = move.info
-        board[ny][nx].moves -= 1
-        board[ny][nx].distance -= move.distance
+        self.moved = self.moved_history.pop()
 
         # Castle
         if '-' in move.name:
             nrx = nx + (move.name.count('0') == 3) * 2 - 1
             king = board[y][nx]
             rook = board[y][nrx]
-            board[y][nx] = Piece()
-            board[y][nrx] = Piece()
+            board[y][nx] = EMPTY_PIECE
+            board[y][nrx] = EMPTY_PIECE
             board[y][x] = king
-            rook.distance -= abs(nrx - info[0])
             board[y][info[0]] = rook
 
         else:
@@ -759,20 +865,16 @@ class Board:
             if move.capture:
                 if move.info:
                     # En passant
-                    board[ny][nx] = Piece()
+                    board[ny][nx] = EMPTY_PIECE
                     board[info[1]][info[0]] = move.capture
                 else:
                     board[ny][nx] = move.capture
             else:
-                board[ny][nx] = Piece()
+                board[ny][nx] = EMPTY_PIECE
 
             # Promotion
             if '=' in move.name:
-                moves = board[ny][nx].moves
-                distance = board[ny][nx].distance
                 board[y][x] = Piece('P' if board[y][x].colour == 'w' else 'p')
-                board[y][x].moves = moves
-                board[y][x].distance = distance
 
         # Update board attributes
         self.active = move.active
@@ -829,10 +931,14 @@ class Board:
 
     def get_fen(self) -> str:
         """Return FEN (Forsyth-Edwards Notation) of board position."""
-        board = '/'.join(''.join(piece.letter for piece in rank)
-                         for rank in self.board)
-        for n in range(self.size[0], 0, -1):
-            board = board.replace(' '*n, str(n))
+        # Generate piece placement only if the position has changed
+        if self.fen_cache[0] != self.version:
+            board = '/'.join(''.join(piece.letter for piece in rank)
+                             for rank in self.board)
+            for n in range(self.size[0], 0, -1):
+                board = board.replace(' '*n, str(n))
+            self.fen_cache = self.version, board
+        board = self.fen_cache[1]
         return (f'{board} {self.active} {self.castling} {self.en_passant} '
                 f'{self.halfmove} {self.fullmove}')
 
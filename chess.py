@@ -1,5 +1,8 @@
 """Chess - Made by Fred Lang."""
 
+from functools import lru_cache
+import queue
+import threading
 import time
 import tkinter as tk
 from tkinter import colorchooser
@@ -10,7 +13,7 @@ import winsound
 import analyse
 import computer
 from board import Board, ChessError
-from piece import Piece
+from piece import EMPTY_PIECE, Piece
 
 
 class TkBoard(tk.Frame):
@@ -41,18 +44,38 @@ class TkBoard(tk.Frame):
         Whether to show evaluation bar.
     sound : bool
         Whether to play sounds.
+    sounds : dict of {str: bytes}
+        Contents of the WAV file of each sound.
+    sound_queue : queue.SimpleQueue
+        Names of sounds waiting to be played by the sound thread.
+    sound_playing : threading.Event
+        Set while the sound thread is playing a sound.
     shape : {'square', 'circle', 'dot', 'point'}
         Grid square shape options.
     piece : {'normal', 'disguised', 'identical', 'invisible'}
         Piece design options.
     animation_speed : float
         Time in seconds per move.
+    animations : dict of {tuple of int: tuple}
+        Start position, displacement, start time and duration of each
+        piece currently being animated.
+    animation_frame : str or None
+        Identifier of the next scheduled animation frame.
+    printed_ranks : tuple of (tuple, list of tuple of (list, list))
+        Square styles and board size when the board was last printed,
+        and the piece letters and printed squares of each rank.
     font_size : int
         Font size used to display the moves analysis text.
     pixels : int
         Length of one square in pixels.
     board_pos : tuple of (int, int)
         Coordinates of the top-left corner of the board.
+    coords_to_pos : function
+        Convert board coordinates to the position on the screen for the
+        current rotation, square size and board size.
+    pos_to_coords : function
+        Convert mouse position to board coordinates for the current
+        rotation, square size and board size.
     colours_rgb : dict of {str: tuple of (int, int, int)}
         RGB colours of the squares and background.
     colours_hex : dict of {str: str}
@@ -70,6 +93,9 @@ class TkBoard(tk.Frame):
         given as the key.
     highlight_last : boolean
         Whether to highlight the last move.
+    last_move_squares : tuple of (Move or None, frozenset)
+        Last move played and the coordinates of its starting and ending
+        squares.
     arrow_start : tuple of (int, int) or ()
         Coordinates of start of a possible arrow.
     arrows : dict of {(int, int, int, int): (int, int, int)}
@@ -77,6 +103,12 @@ class TkBoard(tk.Frame):
         start and end points given as the key.
     move_hints : list of [tuple of (int, int)]
         Coordinates of squares which have move hints.
+    arrow_offsets : dict of {(int, int): (float, float)}
+        Offset of the start of an arrow from the centre of its starting
+        square, given the change in coordinates of the arrow as the key.
+    coord_labels : list of tuple of (list, list, int, int)
+        Labels and colour parities of the board coordinates for each
+        rotation.
     canvas : tk.Canvas
         Canvas the board is drawn on.
     moves_text : tk.Text
@@ -84,7 +116,16 @@ class TkBoard(tk.Frame):
     buttons : tk.Frame
         Frame for buttons.
     images : dict of {str: tk.PhotoImage}
-        Images for the pieces and buttons.
+        Images for the buttons.
+    piece_images : dict of {str: tk.PhotoImage}
+        Resized piece images given the letter as the key. Images are
+        opened when first needed.
+    image_scale : tuple of (int, int, str)
+        Zoom and subsample factors and piece design of the piece
+        images.
+    board_image : tk.PhotoImage or None
+        Image of all the squares of the board, used when the grid
+        square shape is 'square'.
     """
     def __init__(self, window: tk.Tk, board: Board):
         """
@@ -106,12 +147,24 @@ class TkBoard(tk.Frame):
         self.show_legal_moves = True
         self.eval_bar = True
         self.sound = True
+        self.sounds = {}
+        for sound in ('capture', 'castle', 'check', 'game-end', 'game-start',
+                      'illegal', 'move-self', 'promote'):
+            with open(f'sounds/{sound}.wav', 'rb') as file:
+                self.sounds[sound] = file.read()
+        self.sound_queue = queue.SimpleQueue()
+        self.sound_playing = threading.Event()
+        threading.Thread(target=self.play_sounds, daemon=True).start()
         self.shape = 'square'
         self.piece = 'normal'
         self.animation_speed = 0.2
+        self.animations = {}
+        self.animation_frame = None
+        self.printed_ranks = ((), [])
         self.font_size = 12
         self.pixels = pixels = 65
         self.board_pos = (65, 65)
+        self.update_transforms()
 
         self.colours_rgb = {
             'white': (255, 255, 255),
@@ -140,10 +193,16 @@ class TkBoard(tk.Frame):
         self.mouse = ()
         self.highlights = {}
         self.highlight_last = True
+        self.last_move_squares = (None, frozenset())
         self.arrow_start = ()
         self.arrows = {}
         self.move_hints = []
+        self.arrow_offsets = arrow_offsets(size)
+        self.coord_labels = coord_labels(size)
         self.images = {}
+        self.piece_images = {}
+        self.image_scale = (1, 1, self.piece)
+        self.board_image = None
 
         # Main frame
         tk.Frame.__init__(self, window,
@@ -277,25 +336,6 @@ class TkBoard(tk.Frame):
         size = self.size
 
         if event:
-            # Find all necessary piece images and calculate filenames
-            names = {piece.letter: f'{piece.colour} {piece.name}'.lstrip()
-                     for rank in board.board for piece in rank if piece}
-            for colour, pieces in (('w', board.promotion),
-                                   ('b', board.promotion.lower())):
-                for letter in pieces:
-                    if letter not in names:
-                        names[letter] = f'{colour} {Piece(letter).name}'
-
-            # Change filenames for abnormal piece styles
-            if self.piece == 'disguised':
-                for letter, name in names.items():
-                    if name[0] == 'w':
-                        names[letter] = 'w stone'
-                    elif name[0] == 'b':
-                        names[letter] = 'b stone'
-            elif self.piece == 'identical':
-                names = dict.fromkeys(names, 'b stone')
-
             # Calculate resizing factors
             xsize = event.width - 2*self.board_pos[0]
             xsize = xsize // size[self.rotation % 2]
@@ -305,71 +345,88 @@ class TkBoard(tk.Frame):
             resize = [(zoom, -(-180 * zoom // pixels)) for zoom in range(1, 6)]
             zoom, subsample = max(resize, key=lambda i: 180 * i[0] // i[1])
 
-            # Open and resize images
-            if self.piece == 'invisible':
-                self.images.update({letter: tk.PhotoImage()
-                                    for letter in names})
-            else:
-                self.images.update(
-                    {letter: tk.PhotoImage(file=f'images/{name}.png')
-                    .zoom(zoom).subsample(subsample)
-                    for letter, name in names.items()}
-                )
-
-        self.canvas.delete('all')
-        for y in range(size[1]):
-            for x in range(size[0]):
-                piece = board.board[y][x]
-                if piece.letter == 'x' and self.mode == 'move':
+            # Reopen piece images if the scale or piece design changes
+            if (zoom, subsample, self.piece) != self.image_scale:
+                self.image_scale = zoom, subsample, self.piece
+                self.piece_images = {}
+
+        self.update_transforms()
+
+        # Size of the grid square shapes drawn as ovals
+        extent = {'circle': 0.5, 'dot': 0.1}.get(self.shape, 0)
+        # Square colours in screen order, drawn as one image
+        columns = size[self.rotation % 2]
+        rows = size[(self.rotation + 1) % 2]
+        squares = [[self.colours_hex['background']] * columns
+                   for _ in range(rows)]
+        transparent = []
+
+        # Build Tcl scripts so the squares and pieces are each drawn in a
+        # single call instead of one call per canvas item
+        canvas = self.canvas
+        square_items = []
+        piece_items = []
+        # Bind attributes used for every square to local variables
+        coords_to_pos = self.coords_to_pos
+        piece_image = self.piece_image
+        highlights = self.highlights
+        colours_rgb = self.colours_rgb
+        colours_hex = self.colours_hex
+        xpos0, ypos0 = self.board_pos
+        pixels = self.pixels
+        hide_walls = self.mode == 'move'
+        square_shape = self.shape == 'square'
+        parity = sum(size)
+        for y, rank in enumerate(board.board):
+            for x, piece in enumerate(rank):
+                xpos, ypos = coords_to_pos(x, y)
+                column = int((xpos - xpos0) // pixels)
+                row = int((ypos - ypos0) // pixels)
+                if hide_walls and piece.letter == 'x':
+                    transparent.append((column, row))
                     continue
 
                 # Squares and highlights
-                colour = 'dark' if (x + y + sum(size)) % 2 else 'light'
-                if (x, y) in self.highlights:
-                    highlight, opacity = self.highlights[x, y]
-                    colour = rgb_to_hex(round(a - opacity * (a - b))
-                        for a, b in zip(self.colours_rgb[colour], highlight))
+                colour = 'dark' if (x + y + parity) % 2 else 'light'
+                if (x, y) in highlights:
+                    colour = blend(colours_rgb[colour], *highlights[x, y])
                 else:
-                    colour = self.colours_hex[colour]
-
-                # Different grid square shapes
-                if self.shape == 'square':
-                    self.canvas.create_rectangle(
-                        *self.coords_to_pos(x-0.5, y-0.5),
-                        *self.coords_to_pos(x+0.5, y+0.5),
-                        width=0, fill=colour, tags=((x, y), 'square')
-                    )
-                elif self.shape == 'circle':
-                    self.canvas.create_oval(
-                        *self.coords_to_pos(x-0.5, y-0.5),
-                        *self.coords_to_pos(x+0.5, y+0.5),
-                        width=0, fill=colour, tags=((x, y), 'square')
-                    )
-                elif self.shape == 'dot':
-                    self.canvas.create_oval(
-                        *self.coords_to_pos(x-0.1, y-0.1),
-                        *self.coords_to_pos(x+0.1, y+0.1),
-                        width=0, fill=colour, tags=((x, y), 'square')
-                    )
+                    colour = colours_hex[colour]
+
+                if square_shape:
+                    squares[row][column] = colour
                 else:
-                    self.canvas.create_oval(
-                        *self.coords_to_pos(x, y),
-                        *self.coords_to_pos(x, y),
-                        width=0, fill=colour, tags=((x, y), 'square')
+                    x1, y1 = coords_to_pos(x-extent, y-extent)
+                    x2, y2 = coords_to_pos(x+extent, y+extent)
+                    square_items.append(
+                        f'{canvas} create oval {x1} {y1} {x2} {y2} '
+                        f'-width 0 -fill {colour} -tags {{{{{x} {y}}} square}}'
                     )
 
                 if not piece:
                     continue
 
                 # Pieces
-                self.canvas.create_image(*self.coords_to_pos(x, y),
-                    image=self.images[piece.letter], tags=((x, y), 'piece'))
-
-        # Arrows
-        arrows = list(self.arrows.items())
-        self.arrows = {}
-        for coords, colour in arrows:
-            self.draw_arrow(*coords, colour)
+                piece_items.append(f'{canvas} create image {xpos} {ypos} '
+                                   f'-image {piece_image(piece.letter)} '
+                                   f'-tags {{{{{x} {y}}} piece}}')
+
+        # Items are created from the bottom layer to the top layer so that
+        # they do not need to be reordered: squares, coordinates, move
+        # hints, pieces, arrows
+        canvas.delete('all')
+        if self.shape == 'square':
+            # Draw one pixel per square and scale up to the board size
+            image = tk.PhotoImage(width=columns, height=rows)
+            image.put(' '.join(f'{{{" ".join(row)}}}' for row in squares))
+            for column, row in transparent:
+                image.transparency_set(column, row, True)
+            self.board_image = image.zoom(self.pixels)
+            canvas.create_image(*self.board_pos, image=self.board_image,
+                                anchor='nw', tags='square')
+        else:
+            self.board_image = None
+            canvas.tk.eval('\n'.join(square_items))
 
         # Coordinates
         self.update_coords()
@@ -380,9 +437,14 @@ class TkBoard(tk.Frame):
         for move_hint in move_hints:
             self.add_move_hint(*move_hint)
 
-        self.canvas.tag_lower('movehint')
-        self.canvas.tag_lower('coords')
-        self.canvas.tag_lower('square')
+        # Pieces
+        canvas.tk.eval('\n'.join(piece_items))
+
+        # Arrows
+        arrows = list(self.arrows.items())
+        self.arrows = {}
+        for coords, colour in arrows:
+            self.draw_arrow(*coords, colour)
 
         # Piece dragged
         if self.selected:
@@ -428,6 +490,54 @@ class TkBoard(tk.Frame):
         # Evaluation bar
         self.after(0, self.update_eval_bar)
 
+    def piece_image(self, letter: str) -> tk.PhotoImage:
+        """Return resized image of piece, opening it if necessary."""
+        if letter in self.piece_images:
+            return self.piece_images[letter]
+
+        # Calculate filename
+        piece = Piece(letter)
+        name = f'{piece.colour} {piece.name}'.lstrip()
+        # Change filenames for abnormal piece styles
+        if self.piece == 'disguised':
+            if name[0] in {'w', 'b'}:
+                name = f'{name[0]} stone'
+        elif self.piece == 'identical':
+            name = 'b stone'
+
+        # Open and resize image
+        if self.piece == 'invisible':
+            image = tk.PhotoImage()
+        else:
+            zoom, subsample, _ = self.image_scale
+            image = tk.PhotoImage(file=f'images/{name}.png')
+            image = image.zoom(zoom).subsample(subsample)
+        self.piece_images[letter] = image
+        return image
+
+    def update_pieces(self, squares: set):
+        """
+        Redraw pieces only on the specified squares.
+
+        Parameters
+        ----------
+        squares : set of tuple of (int, int)
+            Coordinates of the squares whose pieces have changed.
+        """
+        board = self.board.board
+        canvas = self.canvas
+        for x, y in squares:
+            canvas.delete((x, y, '&&piece'))
+            piece = board[y][x]
+            if not piece or piece.letter == 'x' and self.mode == 'move':
+                continue
+            canvas.create_image(*self.coords_to_pos(x, y),
+                                image=self.piece_image(piece.letter),
+                                tags=((x, y), 'piece'))
+
+        # Evaluation bar
+        self.after(0, self.update_eval_bar)
+
     def colour_square(self, x: int, y: int, colour: tuple, opacity: float):
         """
         Colour square.
@@ -442,7 +552,6 @@ class TkBoard(tk.Frame):
         opacity : float
             Opacity of the colour.
         """
-        square = self.canvas.find_withtag((x, y, '&&square'))
         # Calculate whether square is light or dark
         square_colour = 'dark' if (x + y + sum(self.size)) % 2 else 'light'
 
@@ -452,10 +561,23 @@ class TkBoard(tk.Frame):
         else:
             self.highlights[x, y] = colour, opacity
             # Calculate colour with given opacity
-            colour = rgb_to_hex(round(a - opacity * (a - b)) for a, b in
-                                zip(self.colours_rgb[square_colour], colour))
-
-        self.canvas.itemconfig(square, fill=colour)
+            colour = blend(self.colours_rgb[square_colour], colour, opacity)
+
+        if self.shape != 'square':
+            canvas = self.canvas
+            canvas.itemconfig(canvas.find_withtag((x, y, '&&square')),
+                              fill=colour)
+        elif self.board_image is not None:
+            if self.board.board[y][x].letter == 'x' and self.mode == 'move':
+                return
+            # Fill the square's region of the board image
+            coords_to_pos = self.coords_to_pos
+            xpos0, ypos0 = self.board_pos
+            x1, y1 = coords_to_pos(x-0.5, y-0.5)
+            x2, y2 = coords_to_pos(x+0.5, y+0.5)
+            x1, x2 = sorted((round(x1 - xpos0), round(x2 - xpos0)))
+            y1, y2 = sorted((round(y1 - ypos0), round(y2 - ypos0)))
+            self.board_image.put(colour, to=(x1, y1, x2, y2))
 
     def draw_arrow(self, x1: int, y1: int, x2: int, y2: int, colour: str):
         """
@@ -472,39 +594,33 @@ class TkBoard(tk.Frame):
             colour, arrow is removed.
         """
         coords = x1, y1, x2, y2
-        if coords in self.arrows:
-            arrow = self.canvas.find_withtag((*coords, '&&arrow'))
-            if self.arrows[coords] == colour:
-                self.canvas.delete(arrow)
-                del self.arrows[coords]
+        canvas = self.canvas
+        arrows = self.arrows
+        if coords in arrows:
+            arrow = canvas.find_withtag((*coords, '&&arrow'))
+            if arrows[coords] == colour:
+                canvas.delete(arrow)
+                del arrows[coords]
             else:
-                self.canvas.itemconfig(arrow, fill=colour)
-                self.arrows[coords] = colour
+                canvas.itemconfig(arrow, fill=colour)
+                arrows[coords] = colour
             return
 
         # Calculate arrow coordinates
-        offset = 0.36
-        if x1 == x2:
-            if y2 - y1 < 0:
-                offset *= -1
-            y1 += offset
-        else:
-            gradient = (y2 - y1) / (x2 - x1)
-            offset /= (1 + gradient**2) ** 0.5
-            if x2 - x1 < 0:
-                offset *= -1
-            x1 += offset
-            y1 += gradient * offset
+        xoffset, yoffset = self.arrow_offsets[x2 - x1, y2 - y1]
+        x1 += xoffset
+        y1 += yoffset
 
         pixels = self.pixels
-        arrow = [*self.coords_to_pos(x1, y1), *self.coords_to_pos(x2, y2)]
+        coords_to_pos = self.coords_to_pos
+        arrow = [*coords_to_pos(x1, y1), *coords_to_pos(x2, y2)]
         width = 0.22 * pixels
         arrowshape = (0.36 * pixels, 0.36 * pixels, 0.15 * pixels)
         # Draw arrow from coordinates and calculated arrow shape
-        self.canvas.create_line(*arrow, fill=colour, arrow='last',
+        canvas.create_line(*arrow, fill=colour, arrow='last',
             arrowshape=arrowshape, width=width, tags=(coords, 'arrow'))
 
-        self.arrows[coords] = colour
+        arrows[coords] = colour
 
     def update_coords(self):
         """Update board coordinates."""
@@ -516,26 +632,8 @@ class TkBoard(tk.Frame):
         # Add coordinates
         size = self.size
         pixels = self.pixels
-        if self.rotation == 1:
-            column = [chr(97+x) for x in range(size[0])]
-            row = range(1, size[1]+1)
-            column_colour = size[0]
-            row_colour = 1
-        elif self.rotation == 2:
-            column = range(1, size[1]+1)
-            row = [chr(96+x) for x in range(size[0], 0, -1)]
-            column_colour = 1
-            row_colour = size[1]
-        elif self.rotation == 3:
-            column = [chr(96+x) for x in range(size[0], 0, -1)]
-            row = range(size[1], 0, -1)
-            column_colour = size[1]
-            row_colour = sum(size) + 1
-        else:
-            column = range(size[1], 0, -1)
-            row = [chr(97+x) for x in range(size[0])]
-            column_colour = sum(size) + 1
-            row_colour = size[0]
+        labels = self.coord_labels[self.rotation]
+        column, row, column_colour, row_colour = labels
 
         # Add text
         font = ('Segoe UI', max(1, int(0.17 * pixels)), 'bold')
@@ -556,22 +654,24 @@ class TkBoard(tk.Frame):
 
     def add_move_hint(self, x: int, y: int):
         """Add move hint on square at (x, y)."""
+        colours_rgb = self.colours_rgb
+        pixels = self.pixels
         colour = 'dark' if (x + y + sum(self.size)) % 2 else 'light'
-        colour = self.colours_rgb[colour]
+        colour = colours_rgb[colour]
         if self.is_last_move(x, y):
             colour = (round(a - 0.5 * (a - b)) for a, b in
-                        zip(colour, self.colours_rgb['highlight']))
-        colour = rgb_to_hex(round(0.9 * i) for i in colour)
+                        zip(colour, colours_rgb['highlight']))
+        colour = rgb_to_hex(tuple(round(0.9 * i) for i in colour))
         xpos, ypos = self.coords_to_pos(x, y)
 
         # Draw move hint circles
         if self.board.board[y][x]:
-            width = 0.083 * self.pixels
-            r = (self.pixels - width) / 2
+            width = 0.083 * pixels
+            r = (pixels - width) / 2
             self.canvas.create_oval(xpos-r, ypos-r, xpos+r-1, ypos+r-1,
                 width=width, outline=colour, tags='movehint')
         else:
-            r = self.pixels / 6
+            r = pixels / 6
             self.canvas.create_oval(xpos-r, ypos-r, xpos+r-1, ypos+r-1,
                                     fill=colour, width=0, tags='movehint')
         self.move_hints.append((x, y))
@@ -603,7 +703,7 @@ class TkBoard(tk.Frame):
             if self.board.active == 'b':
                 promote = promote.lower()
             self.canvas.create_image(*self.coords_to_pos(x, y+dy*i),
-                image=self.images[promote], tags='promotion')
+                image=self.piece_image(promote), tags='promotion')
         self.promotion = promotion
 
     def rotate(self):
@@ -745,10 +845,10 @@ class TkBoard(tk.Frame):
                 if x == move.nx and index < len(self.promotion):
                     cursor = 'hand2'
             else:
-                if (x, y) in self.board.legal_moves:
+                if (x, y) in self.board.legal_from:
                     cursor = 'hand2'
                 elif (self.selected and
-                      (*self.selected[:2], x, y) in self.board.legal_moves):
+                      (*self.selected[:2], x, y) in self.board.legal_coords):
                     cursor = 'hand2'
         self.canvas.configure(cursor=cursor)
 
@@ -776,7 +876,7 @@ class TkBoard(tk.Frame):
             self.canvas.delete((move.nx, move.ny, '&&piece'))
             if self.board.board[move.ny][move.nx].colour == 'b':
                 promote = promote.lower()
-            self.canvas.itemconfig(piece, image=self.images[promote],
+            self.canvas.itemconfig(piece, image=self.piece_image(promote),
                                    tags=((move.nx, move.ny), 'piece'))
             self.update_text()
             self.highlight_move()
@@ -1031,9 +1131,8 @@ class TkBoard(tk.Frame):
         self.move_hints = []
 
         if self.show_legal_moves or event.state % 2:
-            for move in self.board.legal_moves:
-                if (x, y) == move:
-                    self.add_move_hint(move.nx, move.ny)
+            for move in self.board.legal_from.get((x, y), ()):
+                self.add_move_hint(move.nx, move.ny)
             self.canvas.tag_raise('piece')
 
         self.canvas.tag_raise(piece)
@@ -1059,14 +1158,13 @@ class TkBoard(tk.Frame):
         # Move piece in move mode
         if self.mode == 'move':
             promotion = []
-            for move in self.board.legal_moves:
-                if move == (sx, sy, x, y):
-                    if '=' not in move.name:
-                        break
-                    promote = move.name[move.name.index('=') + 1]
-                    promotion.append((promote, move))
-                    if self.auto_promote and not event.state & 131077:
-                        break
+            for move in self.board.legal_coords.get((sx, sy, x, y), ()):
+                if '=' not in move.name:
+                    break
+                promote = move.name[move.name.index('=') + 1]
+                promotion.append((promote, move))
+                if self.auto_promote and not event.state & 131077:
+                    break
             else:
                 if not promotion:
                     for move in self.board.illegal_moves:
@@ -1088,8 +1186,10 @@ class TkBoard(tk.Frame):
 
         # Move piece in setup mode
         else:
-            self.board.board[y][x] = Piece(self.board.board[sy][sx].letter)
-            self.board.board[sy][sx] = Piece()
+            self.board.board[y][x] = self.board.board[sy][sx]
+            self.board.board[sy][sx] = EMPTY_PIECE
+            self.board.moved.pop((sx, sy), None)
+            self.board.moved.pop((x, y), None)
             self.board.legal_moves = self.board.get_moves()
             self.canvas.coords(piece, *self.coords_to_pos(x, y))
             self.canvas.delete((x, y, '&&piece'))
@@ -1142,7 +1242,7 @@ class TkBoard(tk.Frame):
             promote = move.name[move.name.index('=') + 1]
             if self.board.board[ny][nx].colour == 'b':
                 promote = promote.lower()
-            self.canvas.itemconfig(piece, image=self.images[promote])
+            self.canvas.itemconfig(piece, image=self.piece_image(promote))
             sound = 'promote'
         # Capture
         elif move.capture:
@@ -1190,12 +1290,15 @@ class TkBoard(tk.Frame):
 
         # Undo all
         if undo_all:
+            squares = set()
+            for move in self.board.moves:
+                squares |= move_squares(move)
             while len(self.board.moves) > 1:
                 self.board.undone_moves.append(self.board.moves[-1])
                 self.board.undo(update_moves=False)
             self.board.undo()
             self.highlight_move()
-            self.refresh()
+            self.update_pieces(squares)
             return
 
         # Undo last
@@ -1233,15 +1336,15 @@ class TkBoard(tk.Frame):
             if info:
                 # En passant
                 self.canvas.create_image(*self.coords_to_pos(*info),
-                    image=self.images[letter], tags=(info, 'piece'))
+                    image=self.piece_image(letter), tags=(info, 'piece'))
             else:
                 self.canvas.create_image(*self.coords_to_pos(nx, ny),
-                    image=self.images[letter], tags=((nx, ny), 'piece'))
+                    image=self.piece_image(letter), tags=((nx, ny), 'piece'))
             sound = 'capture'
         # Promotion
         if '=' in move.name:
             letter = self.board.board[y][x].letter
-            self.canvas.itemconfig(piece, image=self.images[letter])
+            self.canvas.itemconfig(piece, image=self.piece_image(letter))
             sound = 'promote'
         # Check
         if move.name[-1] in {'+', '#'}:
@@ -1273,12 +1376,15 @@ class TkBoard(tk.Frame):
 
         # Redo all
         if redo_all:
+            squares = set()
+            for move in self.board.undone_moves:
+                squares |= move_squares(move)
             while len(self.board.undone_moves) > 1:
                 self.board.redo(update_moves=False)
                 self.board.undone_moves.pop()
             self.board.redo()
             self.highlight_move()
-            self.refresh()
+            self.update_pieces(squares)
             return
 
         # Redo last
@@ -1375,24 +1481,38 @@ class TkBoard(tk.Frame):
         if not self.sound:
             return
 
-        winsound.PlaySound(None, winsound.SND_PURGE)
-        winsound.PlaySound(
-            f'sounds/{sound}.wav',
-            winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT
-        )
+        self.sound_queue.put(sound)
+        self.stop_sound()
+
+    def stop_sound(self):
+        """Stop the current sound while a newer sound is queued."""
+        if self.sound_queue.empty():
+            return
+
+        # The sound thread may not have started the current sound yet,
+        # so keep stopping it until the sound thread takes the new sound
+        if self.sound_playing.is_set():
+            winsound.PlaySound(None, 0)
+        self.after(10, self.stop_sound)
+
+    def play_sounds(self):
+        """Play sounds from the sound queue until the program exits."""
+        # Sounds cannot be played asynchronously from memory, so they are
+        # played on this thread instead of the Tk thread
+        flags = winsound.SND_MEMORY | winsound.SND_NODEFAULT
+        while True:
+            sound = self.sound_queue.get()
+            # Skip sounds which were replaced while the last one played
+            while not self.sound_queue.empty():
+                sound = self.sound_queue.get()
+            self.sound_playing.set()
+            winsound.PlaySound(self.sounds[sound], flags)
+            self.sound_playing.clear()
 
     def animate(self, piece, sx: int, sy: int, x: int, y: int):
         """Animate the movement of a piece from (sx, sy) to (x, y)."""
-        def next_frame(start_time, piece, sx, sy, dx, dy, speed):
-            proportion = (time.time() - start_time + 0.02) / speed
-            if proportion < 1:
-                self.canvas.coords(piece, sx+proportion*dx, sy+proportion*dy)
-                # Recursive call to animate next frame
-                self.after(10, next_frame, start_time, piece,
-                           sx, sy, dx, dy, speed)
-            else:
-                # Base case: place piece at destination coordinates
-                self.canvas.coords(piece, sx + dx, sy + dy)
+        # Stop animation of the piece if it is still moving
+        self.animations.pop(piece, None)
 
         sx, sy = self.coords_to_pos(sx, sy)
         x, y = self.coords_to_pos(x, y)
@@ -1402,8 +1522,29 @@ class TkBoard(tk.Frame):
             self.canvas.coords(piece, x, y)
             return
 
-        start_time = time.time()
-        next_frame(start_time, piece, sx, sy, x - sx, y - sy, speed)
+        start_time = time.perf_counter()
+        self.animations[piece] = sx, sy, x - sx, y - sy, start_time, speed
+        if self.animation_frame is None:
+            self.next_frame()
+
+    def next_frame(self):
+        """Move all pieces being animated to their next positions."""
+        now = time.perf_counter()
+        for piece, animation in list(self.animations.items()):
+            sx, sy, dx, dy, start_time, speed = animation
+            proportion = (now - start_time + 0.02) / speed
+            if proportion < 1:
+                self.canvas.coords(piece, sx+proportion*dx, sy+proportion*dy)
+            else:
+                # Place piece at destination coordinates
+                del self.animations[piece]
+                self.canvas.coords(piece, sx + dx, sy + dy)
+
+        # Schedule next frame (about 60 per second) while pieces are moving
+        if self.animations:
+            self.animation_frame = self.after(16, self.next_frame)
+        else:
+            self.animation_frame = None
 
     def illegal(self):
         """Animate illegal move red flashes and play sound."""
@@ -1502,11 +1643,6 @@ class TkBoard(tk.Frame):
 
             # Set data
             self.board.__init__(pgn)
-            self.size = self.board.size
-            self.canvas.event_generate('<Configure>',
-                width=self.canvas.winfo_width(),
-                height=self.canvas.winfo_height()
-            )
             if self.board.get_fen() == '8/8/8/8/8/8/8/8 w KQkq - 0 1':
                 if '\n' not in pgn and '/' in pgn:
                     # FEN
@@ -1514,6 +1650,15 @@ class TkBoard(tk.Frame):
                 else:
                     # PGN
                     self.board.load_pgn(pgn)
+
+            # Resize the board to the size of the loaded position
+            self.size = self.board.size
+            self.arrow_offsets = arrow_offsets(self.size)
+            self.coord_labels = coord_labels(self.size)
+            self.canvas.event_generate('<Configure>',
+                width=self.canvas.winfo_width(),
+                height=self.canvas.winfo_height()
+            )
             if white and self.board.tag_pairs['White'] == '?':
                 self.board.tag_pairs['White'] = white
             if black and self.board.tag_pairs['Black'] == '?':
@@ -1802,66 +1947,85 @@ class TkBoard(tk.Frame):
             else:
                 self.moves_text.insert('end', move.comment, 'Segoe')
 
-    def pos_to_coords(self, x: float, y: float) -> tuple:
-        """Convert mouse position to board coordinates."""
-        x -= self.board_pos[0]
-        y -= self.board_pos[1]
-        x //= self.pixels
-        y //= self.pixels
-        if self.rotation == 1:
-            return y, self.size[1] - x - 1
-        if self.rotation == 2:
-            return self.size[0] - x - 1, self.size[1] - y - 1
-        if self.rotation == 3:
-            return self.size[0] - y - 1, x
-        return x, y
-
-    def coords_to_pos(self, x: float, y: float) -> tuple:
-        """Convert board coordinates to the position on the screen."""
+    def update_transforms(self):
+        """
+        Update coords_to_pos and pos_to_coords for the current rotation,
+        square size and board size.
+        """
         pixels = self.pixels
-        x = (x + 0.5) * pixels
-        y = (y + 0.5) * pixels
-        if self.rotation == 1:
-            x, y = self.size[1] * pixels - y, x
-        if self.rotation == 2:
-            x = self.size[0] * pixels - x
-            y = self.size[1] * pixels - y
-        if self.rotation == 3:
-            x, y = y, self.size[0] * pixels - x
-
-        return x + self.board_pos[0], y + self.board_pos[1]
+        bx, by = self.board_pos
+        xsize, ysize = self.size
+        width = xsize * pixels
+        height = ysize * pixels
+
+        # Board coordinates to screen position for each rotation
+        self.coords_to_pos = (
+            lambda x, y: ((x+0.5)*pixels + bx, (y+0.5)*pixels + by),
+            lambda x, y: (height - (y+0.5)*pixels + bx, (x+0.5)*pixels + by),
+            lambda x, y: (width - (x+0.5)*pixels + bx,
+                          height - (y+0.5)*pixels + by),
+            lambda x, y: ((y+0.5)*pixels + bx, width - (x+0.5)*pixels + by)
+        )[self.rotation]
+
+        # Mouse position to board coordinates for each rotation
+        self.pos_to_coords = (
+            lambda x, y: ((x-bx) // pixels, (y-by) // pixels),
+            lambda x, y: ((y-by) // pixels, ysize - (x-bx)//pixels - 1),
+            lambda x, y: (xsize - (x-bx)//pixels - 1,
+                          ysize - (y-by)//pixels - 1),
+            lambda x, y: (xsize - (y-by)//pixels - 1, (x-bx) // pixels)
+        )[self.rotation]
 
     def is_last_move(self, x: int, y: int) -> bool:
         """
         Return True if (x, y) is part of the last move, False otherwise.
         """
-        if not self.highlight_last:
+        if not self.highlight_last or not self.board.moves:
             return False
-        if self.board.moves:
-            return (x, y) in {
-                (self.board.moves[-1].x, self.board.moves[-1].y),
-                (self.board.moves[-1].nx, self.board.moves[-1].ny)
-            }
-        return False
+
+        # Find squares of the last move only when it changes
+        move = self.board.moves[-1]
+        if self.last_move_squares[0] is not move:
+            squares = frozenset({(move.x, move.y), (move.nx, move.ny)})
+            self.last_move_squares = move, squares
+        return (x, y) in self.last_move_squares[1]
 
     def print(self):
         """Print board using unicode characters for pieces."""
-        board = [rank[:] for rank in self.board.board]
         size = self.size
-        # Using ANSI escape sequences to print squares in colour
+        parity = sum(size)
+        # Using ANSI escape sequences to print squares in colour, given
+        # whether the square has a piece and whether it is dark
         light = f'48;2;{";".join(map(str, self.colours_rgb["light"]))}'
         dark = f'48;2;{";".join(map(str, self.colours_rgb["dark"]))}'
+        styles = ((f'\x1B[{light}m', f'\x1B[{dark}m'),
+                  (f'\x1B[30;{light}m', f'\x1B[30;{dark}m'))
+
+        # Reuse printed ranks if the colours and board size are the same
+        if self.printed_ranks[0] != (styles, size):
+            self.printed_ranks = (styles, size), []
+        printed = self.printed_ranks[1]
+
+        # Generate string for each square of ranks changed since printed
+        board = []
+        for y, rank in enumerate(self.board.board):
+            letters = [piece.letter for piece in rank]
+            if y < len(printed) and printed[y][0] == letters:
+                board.append(printed[y][1])
+                continue
 
-        # Generate string for each square on the board
-        for y in range(len(board)):
-            for x in range(len(board[0])):
-                if board[y][x].letter in {'x', 'X'}:
-                    board[y][x] = '  '
-                    continue
-
-                fg = '30;' if board[y][x] else ''
-                bg = dark if (x + y + sum(size)) % 2 else light
-                board[y][x] = f'\x1B[{fg}{bg}m{board[y][x]} \x1B[0m'
+            squares = []
+            for x, piece in enumerate(rank):
+                if piece.letter in {'x', 'X'}:
+                    squares.append('  ')
+                else:
+                    style = styles[bool(piece)][(x + y + parity) % 2]
+                    squares.append(f'{style}{piece} \x1B[0m')
+            board.append(squares)
+            if y < len(printed):
+                printed[y] = letters, squares
+            else:
+                printed.append((letters, squares))
 
         # Rotations
         if self.rotation == 1:
@@ -1912,9 +2076,119 @@ class TkBoard(tk.Frame):
             print(depth, nodes, f"{run_time:.3f}", f"{nodes/run_time:.3f}")
 
 
+def arrow_offsets(size: tuple) -> dict:
+    """
+    Return offsets of the start of arrows for a board size.
+
+    Arrows start 0.36 squares from the centre of their starting square
+    in the direction of the arrow.
+
+    Parameters
+    ----------
+    size : tuple of (int, int)
+        Number of columns and rows of the board.
+
+    Returns
+    -------
+    dict of {(int, int): (float, float)}
+        Offset of the start of an arrow given the change in coordinates
+        of the arrow.
+    """
+    offsets = {}
+    for dx in range(1-size[0], size[0]):
+        for dy in range(1-size[1], size[1]):
+            offset = 0.36
+            if not dx:
+                if not dy:
+                    continue
+                if dy < 0:
+                    offset *= -1
+                offsets[dx, dy] = 0, offset
+            else:
+                gradient = dy / dx
+                offset /= (1 + gradient**2) ** 0.5
+                if dx < 0:
+                    offset *= -1
+                offsets[dx, dy] = offset, gradient * offset
+    return offsets
+
+
+@lru_cache(maxsize=None)
+def blend(colour: tuple, overlay: tuple, opacity: float) -> str:
+    """
+    Return HEX colour of an RGB colour covered by a translucent colour.
+
+    Only a few combinations of square colours, highlight colours and
+    opacities are used, so results are cached.
+
+    Parameters
+    ----------
+    colour : tuple of (int, int, int)
+        RGB colour underneath.
+    overlay : tuple of (int, int, int)
+        RGB colour on top.
+    opacity : float
+        Opacity of the colour on top.
+    """
+    return rgb_to_hex(tuple(round(a - opacity * (a - b))
+                            for a, b in zip(colour, overlay)))
+
+
+def coord_labels(size: tuple) -> list:
+    """
+    Return board coordinate labels for a board size.
+
+    Parameters
+    ----------
+    size : tuple of (int, int)
+        Number of columns and rows of the board.
+
+    Returns
+    -------
+    list of tuple of (list, list, int, int)
+        Labels down the left side and along the bottom of the board,
+        and the parity of the colours of their squares, for each number
+        of 90-degree clockwise rotations.
+    """
+    files = [chr(97+x) for x in range(size[0])]
+    ranks = list(range(1, size[1]+1))
+    return [
+        (ranks[::-1], files, sum(size) + 1, size[0]),
+        (files, ranks, size[0], 1),
+        (ranks, files[::-1], 1, size[1]),
+        (files[::-1], ranks[::-1], size[1], sum(size) + 1)
+    ]
+
+
+def move_squares(move) -> set:
+    """
+    Return the squares whose pieces change when a move is played.
+
+    Parameters
+    ----------
+    move : Move
+        Move to find the squares of.
+
+    Returns
+    -------
+    set of tuple of (int, int)
+        Coordinates of the starting and ending squares, and of the
+        rook's squares when castling or the captured pawn's square when
+        capturing en passant.
+    """
+    squares = {(move.x, move.y), (move.nx, move.ny)}
+    if move.info:
+        squares.add(move.info)
+    if '-' in move.name:
+        nrx = move.nx + (move.name.count('0') == 3) * 2 - 1
+        squares.add((nrx, move.ny))
+    return squares
+
+
+@lru_cache(maxsize=None)
 def rgb_to_hex(rgb: tuple) -> str:
     """Convert RGB colour to HEX."""
-    return '#' + ''.join(f'{i:02x}' for i in rgb)
+    return '#%02x%02x%02x' % rgb
 
 
 def command_line_interface(tkboard: TkBoard):
@@ -1930,7 +2204,8 @@ def command_line_interface(tkboard: TkBoard):
             board.move(input(f"{board.active}: "))
         except ChessError:
             print("Illegal move")
-        tkboard.refresh()
+        else:
+            tkboard.update_pieces(move_squares(board.moves[-1]))
 
 
 def main():
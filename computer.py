@@ -1,11 +1,27 @@
 """Chess computers."""
 
+from functools import partial
+import os
 import random
+import re
 import subprocess
+import threading
 import time
 
 from piece import PIECES
 
+# Letters of each file of the board
+FILES = tuple(chr(97+i) for i in range(26))
+
+# Multipv number, score type, score and first move of a UCI info line
+INFO_PATTERN = re.compile(
+    rb'multipv (\d+) .*?score (cp|mate) (-?\d+) .*?pv (\S+)')
+
+# Stockfish process shared by all boards, opened when first needed. The
+# lock only stops two threads opening it at once, not searching at once.
+STOCKFISH = []
+STOCKFISH_LOCK = threading.Lock()
+
 
 def get_engine(engine: str):
     """Return engine function."""
@@ -24,7 +40,7 @@ def get_engine(engine: str):
         return engines[engine]
 
     if engine.startswith('Stockfish') and engine[9:].isdecimal():
-        return lambda board: stockfish(board, elo=int(engine[9:]))
+        return partial(stockfish, elo=int(engine[9:]))
 
     if engine.endswith('lover'):
         piece = engine[:-5]
@@ -32,18 +48,118 @@ def get_engine(engine: str):
             return lambda board: piece_lover(board, piece.lower())
 
 
-def open_stockfish(board):
-    """Open Stockfish and return Stockfish."""
-    if not hasattr(board, 'stockfish'):
-        board.stockfish = subprocess.Popen(
-            'stockfish\stockfish-windows-x86-64-avx2.exe',
-            universal_newlines=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT
-        )
-        board.stockfish.stdout.readline()
-    return board.stockfish
+def open_stockfish():
+    """
+    Open Stockfish if it is not already open and return Stockfish.
+
+    Only opening Stockfish is guarded by `STOCKFISH_LOCK`. Searches are
+    not, so only one thread should search at a time.
+
+    Returns
+    -------
+    subprocess.Popen
+        Stockfish, shared by all boards. These attributes are added to
+        the process when it is opened:
+            buffer : bytearray
+                Output read from Stockfish but not yet returned by
+                `read_line`.
+            options : dict of {str: str or int}
+                Values of the UCI options last sent to Stockfish.
+            game : int or None
+                Game of the last position searched. 'ucinewgame' is
+                only sent when searching a different game.
+    """
+    with STOCKFISH_LOCK:
+        if not STOCKFISH:
+            stockfish = subprocess.Popen(
+                'stockfish\stockfish-windows-x86-64-avx2.exe',
+                stdout=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                stderr=subprocess.STDOUT
+            )
+            stockfish.buffer = bytearray()
+            stockfish.options = {}
+            stockfish.game = None
+            read_line(stockfish)
+            STOCKFISH.append(stockfish)
+    return STOCKFISH[0]
+
+
+def start_search(board, time: int, options: dict):
+    """
+    Open Stockfish, set options and start searching the position.
+
+    Parameters
+    ----------
+    board : Board
+        Board of the position to search.
+    time : int
+        Time to search in milliseconds.
+    options : dict of {str: str or int}
+        Values of UCI options. Only options which have changed since the
+        last search are sent.
+
+    Returns
+    -------
+    subprocess.Popen
+        Stockfish.
+    """
+    stockfish = open_stockfish()
+    commands = []
+    # Only clear Stockfish's memory of the last game for another game
+    if stockfish.game != board.game:
+        stockfish.game = board.game
+        commands.append('ucinewgame\n')
+    for name, value in options.items():
+        if stockfish.options.get(name) != value:
+            stockfish.options[name] = value
+            commands.append(f'setoption name {name} value {value}\n')
+    commands.append(f'position fen {board.get_fen()}\n')
+    commands.append(f'go movetime {time}\n')
+
+    # Send all commands at once
+    stockfish.stdin.write(''.join(commands).encode())
+    stockfish.stdin.flush()
+    read_line(stockfish)
+    return stockfish
+
+
+def read_line(stockfish) -> bytes:
+    """Read next line of Stockfish output."""
+    # Read output in large chunks until a whole line is buffered
+    buffer = stockfish.buffer
+    end = buffer.find(b'\n')
+    while end == -1:
+        data = os.read(stockfish.stdout.fileno(), 65536)
+        if not data:
+            return b''
+        buffer += data
+        end = buffer.find(b'\n', len(buffer) - len(data))
+
+    line = bytes(buffer[:end])
+    del buffer[:end+1]
+    return line
+
+
+def uci_moves(board) -> dict:
+    """
+    Return legal moves given their UCI notation, reusing the moves
+    found for the same position.
+    """
+    if board.uci_cache[0] is not board.legal_moves:
+        moves = {}
+        ysize = board.size[1]
+        for legal_move in board.legal_moves:
+            if '=' in legal_move.name:
+                promote = legal_move.name[legal_move.name.index('=') + 1]
+                promote = promote.lower()
+            else:
+                promote = ''
+            uci = (FILES[legal_move.x] + str(ysize-legal_move.y) +
+                   FILES[legal_move.nx] + str(ysize-legal_move.ny) + promote)
+            moves.setdefault(uci, legal_move)
+        board.uci_cache = board.legal_moves, moves
+    return board.uci_cache[1]
 
 
 def standardise_eval(evaluation: float):
@@ -106,41 +222,28 @@ def stockfish(board, time: int = 50, elo: int = 3600):
         return
 
     # Initialise Stockfish
-    stockfish = open_stockfish(board)
     if elo > 2850:
-        stockfish.stdin.write('setoption name UCI_LimitStrength value false\n')
+        options = {'UCI_LimitStrength': 'false'}
     else:
-        elo = max(elo, 1350)
-        stockfish.stdin.write('setoption name UCI_LimitStrength value true\n')
-        stockfish.stdin.write(f'setoption name UCI_Elo value {elo}\n')
-
-    stockfish.stdin.write('setoption name MultiPV value 1\n')
-    stockfish.stdin.write(f'position fen {board.get_fen()}\n')
-    stockfish.stdin.write(f'go movetime {time}\n')
-    stockfish.stdin.flush()
-    stockfish.stdout.readline()
+        options = {'UCI_LimitStrength': 'true', 'UCI_Elo': max(elo, 1350)}
+    options['MultiPV'] = 1
+    stockfish = start_search(board, time, options)
 
     # Read lines to find the 'bestmove' line
     while True:
-        line = stockfish.stdout.readline().strip().split()
-        if not line:
-            continue
-        if line[0] == 'bestmove':
+        line = read_line(stockfish)
+        if line.startswith(b'bestmove'):
             break
-        if 'cp' in line:
-            score_type = 'cp'
-        elif 'mate' in line:
-            score_type = 'mate'
-        else:
-            continue
-        evaluation = line[line.index(score_type) + 1]
+        info = INFO_PATTERN.search(line)
+        if info:
+            _, score_type, evaluation, _ = info.groups()
 
     evaluation = int(evaluation)
     if board.active == 'b':
         evaluation *= -1
 
     # Centipawn evaluation
-    if score_type == 'cp':
+    if score_type == b'cp':
         board.evaluation = evaluation / 100
     # Moves until mate
     else:
@@ -148,19 +251,9 @@ def stockfish(board, time: int = 50, elo: int = 3600):
             evaluation = float('inf') if board.active == 'b' else float('-inf')
         board.evaluation = evaluation
 
-    move = line[1]
-    ysize = board.size[1]
-
-    # Search for move in list of legal moves
-    for legal_move in board.legal_moves:
-        if '=' in legal_move.name:
-            promote = legal_move.name[legal_move.name.index('=') + 1].lower()
-        else:
-            promote = ''
-        uci = (f'{chr(97+legal_move.x)}{ysize-legal_move.y}'
-               f'{chr(97+legal_move.nx)}{ysize-legal_move.ny}{promote}')
-        if move == uci:
-            return legal_move
+    move = line.split()[1].decode()
+    # Find move in legal moves
+    return uci_moves(board).get(move)
 
 
 def taunter(board, time: int = 50):
@@ -169,54 +262,34 @@ def taunter(board, time: int = 50):
         return
 
     # Initialise Stockfish
-    stockfish = open_stockfish(board)
-    stockfish.stdin.write('setoption name UCI_LimitStrength value false\n')
-    stockfish.stdin.write('setoption name MultiPV value 5\n')
-    stockfish.stdin.write(f'position fen {board.get_fen()}\n')
-    stockfish.stdin.write(f'go movetime {time}\n')
-    stockfish.stdin.flush()
-    stockfish.stdout.readline()
+    options = {'UCI_LimitStrength': 'false', 'MultiPV': 5}
+    stockfish = start_search(board, time, options)
 
     # Search for worst move with evaluation > 300 centipawns
-    taunt_move = ''
+    taunt_move = b''
     while True:
-        line = stockfish.stdout.readline().strip().split()
-        if not line:
-            continue
-        if line[0] == 'bestmove':
+        line = read_line(stockfish)
+        if line.startswith(b'bestmove'):
             if not taunt_move:
                 taunt_move = move
             break
-        if 'multipv' in line:
-            if line[line.index('multipv') + 1] == '1':
-                taunt_move = ''
-                move = line[line.index('pv') + 1]
+        info = INFO_PATTERN.search(line)
+        if info:
+            multipv, score_type, evaluation, pv = info.groups()
+            if multipv == b'1':
+                taunt_move = b''
+                move = pv
             if taunt_move:
                 continue
 
-            if 'cp' in line:
-                score_type = 'cp'
-            else:
-                score_type = 'mate'
-            evaluation = int(line[line.index(score_type) + 1])
-
-            if evaluation < 300 or score_type == 'mate' and evaluation < 0:
+            evaluation = int(evaluation)
+            if evaluation < 300 or score_type == b'mate' and evaluation < 0:
                 taunt_move = move
             else:
-                move = line[line.index('pv') + 1]
-
-    ysize = board.size[1]
+                move = pv
 
-    # Search for move in list of legal moves
-    for legal_move in board.legal_moves:
-        if '=' in legal_move.name:
-            promote = legal_move.name[legal_move.name.index('=') + 1].lower()
-        else:
-            promote = ''
-        uci = (f'{chr(97+legal_move.x)}{ysize-legal_move.y}'
-               f'{chr(97+legal_move.nx)}{ysize-legal_move.ny}{promote}')
-        if taunt_move == uci:
-            return legal_move
+    # Find move in legal moves
+    return uci_moves(board).get(taunt_move.decode())
 
 
 def drawfish(board, time: int = 100):
@@ -225,54 +298,34 @@ def drawfish(board, time: int = 100):
         return
 
     # Intialise Stockfish
-    stockfish = open_stockfish(board)
-    stockfish.stdin.write('setoption name UCI_LimitStrength value false\n')
-    stockfish.stdin.write('setoption name MultiPV value 500\n')
-    stockfish.stdin.write(f'position fen {board.get_fen()}\n')
-    stockfish.stdin.write(f'go movetime {time}\n')
-    stockfish.stdin.flush()
-    stockfish.stdout.readline()
+    options = {'UCI_LimitStrength': 'false', 'MultiPV': 500}
+    stockfish = start_search(board, time, options)
 
     # Search for worst move that is not losing
-    draw_move = ''
+    draw_move = b''
     while True:
-        line = stockfish.stdout.readline().strip().split()
-        if not line:
-            continue
-        if line[0] == 'bestmove':
+        line = read_line(stockfish)
+        if line.startswith(b'bestmove'):
             if not draw_move:
                 draw_move = move
             break
-        if 'multipv' in line:
-            if line[line.index('multipv') + 1] == '1':
-                draw_move = ''
-                move = line[line.index('pv') + 1]
+        info = INFO_PATTERN.search(line)
+        if info:
+            multipv, score_type, evaluation, pv = info.groups()
+            if multipv == b'1':
+                draw_move = b''
+                move = pv
             if draw_move:
                 continue
 
-            if 'cp' in line:
-                score_type = 'cp'
-            else:
-                score_type = 'mate'
-            evaluation = int(line[line.index(score_type) + 1])
-
+            evaluation = int(evaluation)
             if evaluation < 0:
                 draw_move = move
             else:
-                move = line[line.index('pv') + 1]
+                move = pv
 
-    ysize = board.size[1]
-
-    # Search for move in list of legal moves
-    for legal_move in board.legal_moves:
-        if '=' in legal_move.name:
-            promote = legal_move.name[legal_move.name.index('=') + 1].lower()
-        else:
-            promote = ''
-        uci = (f'{chr(97+legal_move.x)}{ysize-legal_move.y}'
-               f'{chr(97+legal_move.nx)}{ysize-legal_move.ny}{promote}')
-        if draw_move == uci:
-            return legal_move
+    # Find move in legal moves
+    return uci_moves(board).get(draw_move.decode())
 
 
 def badfish(board, time: int = 50):
@@ -281,46 +334,38 @@ def badfish(board, time: int = 50):
         return
 
     # Initialise Stockfish
-    stockfish = open_stockfish(board)
-    stockfish.stdin.write('setoption name UCI_LimitStrength value false\n')
-    stockfish.stdin.write('setoption name MultiPV value 500\n')
-    stockfish.stdin.write(f'position fen {board.get_fen()}\n')
-    stockfish.stdin.write(f'go movetime {time}\n')
-    stockfish.stdin.flush()
-    stockfish.stdout.readline()
+    options = {'UCI_LimitStrength': 'false', 'MultiPV': 500}
+    stockfish = start_search(board, time, options)
 
     # Find the worst move
     while True:
-        line = stockfish.stdout.readline().strip().split()
-        if not line:
-            continue
-        if line[0] == 'bestmove':
+        line = read_line(stockfish)
+        if line.startswith(b'bestmove'):
             break
-        if 'pv' in line:
-            move = line[line.index('pv') + 1]
+        info = INFO_PATTERN.search(line)
+        if info:
+            move = info.group(4)
 
-    ysize = board.size[1]
-
-    # Find move in list of legal moves
-    for legal_move in board.legal_moves:
-        if '=' in legal_move.name:
-            promote = legal_move.name[legal_move.name.index('=') + 1].lower()
-        else:
-            promote = ''
-        uci = (f'{chr(97+legal_move.x)}{ysize-legal_move.y}'
-               f'{chr(97+legal_move.nx)}{ysize-legal_move.ny}{promote}')
-        if move == uci:
-            return legal_move
+    # Find move in legal moves
+    return uci_moves(board).get(move.decode())
 
 
 def percent_bot(board, engine1, p: float, engine2=random_move):
     """Return engine1 move p% of the time otherwise engine2 move."""
-    start_time = time.time()
+    start_time = time.monotonic()
     if random.random() < p/100:
         move = engine1(board)
     else:
         move = engine2(board)
 
+    # Open Stockfish while waiting if either engine uses it, so that it
+    # does not have to start up when it is first needed
+    engines = {getattr(engine, 'func', engine)
+               for engine in (engine1, engine2)}
+    if (board.variant == 'Standard' and
+            engines & {stockfish, taunter, drawfish, badfish}):
+        open_stockfish()
+
     # Always make sure to return after at least 50ms
-    time.sleep(max(0, 0.05-time.time()+start_time))
+    time.sleep(max(0, 0.05-time.monotonic()+start_time))
     return move
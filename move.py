@@ -1,5 +1,7 @@
 """Move class."""
 
+import math
+
 
 class Move:
     """
@@ -36,6 +38,10 @@ class Move:
         Computer evaluation of the position. Infinity for checkmate.
         Integer type means moves until mate. Positive for white
         advantage, negative for black advantage, 0 for draw.
+    state : tuple of (str, str, str, int, int, float)
+        Active colour, castling availability, en passant target square,
+        halfmove clock, fullmove number and evaluation before the move
+        is played. Shared by all moves of the same position.
     hash : tuple of (str, str, str, str)
         Hash of board state before the move is played.
     capture : Piece or None
@@ -63,8 +69,15 @@ class Move:
     comment : str
         Comment of the move.
     """
-    def __init__(self, name: str, x: int, y: int, nx: int, ny: int, board,
-            hash: tuple, capture=None, info: tuple = None, type: str = ''):
+    __slots__ = (
+        'name', 'x', 'y', 'nx', 'ny', 'state', 'hash', 'capture', 'info',
+        'type', 'eval_change', 'win_change', 'classification', 'comment',
+        '_distance'
+    )
+
+    def __init__(self, name: str, x: int, y: int, nx: int, ny: int,
+            state: tuple, hash: tuple, capture=None, info: tuple = None,
+            type: str = ''):
         """
         Initiate move attributes.
 
@@ -76,8 +89,11 @@ class Move:
             Coordinates of starting square of move.
         nx, ny : int
             Coordinates of ending square of move.
-        board : Board
-            Board state before the move is played.
+        state : tuple of (str, str, str, int, int, float)
+            Active colour, castling availability, en passant target
+            square, halfmove clock, fullmove number and evaluation of
+            the board before the move is played. Shared by all moves of
+            the same position.
         hash : tuple of (str, str, str, str)
             Hash of board state before the move is played.
         capture : Piece, default=None
@@ -98,26 +114,73 @@ class Move:
         self.y = y
         self.nx = nx
         self.ny = ny
-        self.active = board.active
-        self.castling = board.castling
-        self.en_passant = board.en_passant
-        self.halfmove = board.halfmove
-        self.fullmove = board.fullmove
-        self.evaluation = board.evaluation
+        self.state = state
         self.hash = hash
         self.capture = capture
         self.info = info
         self.type = type
-        self.distance = ((nx-x)**2 + (ny-y)**2) ** 0.5
         self.eval_change = None
         self.win_change = None
         self.classification = ''
         self.comment = ''
 
+    @property
+    def active(self) -> str:
+        """Active colour of the move."""
+        return self.state[0]
+
+    @property
+    def castling(self) -> str:
+        """Castling availability just before the move is played."""
+        return self.state[1]
+
+    @property
+    def en_passant(self) -> str:
+        """En passant target square just before the move is played."""
+        return self.state[2]
+
+    @property
+    def halfmove(self) -> int:
+        """Halfmove clock just before the move is played."""
+        return self.state[3]
+
+    @property
+    def fullmove(self) -> int:
+        """Fullmove number of the move."""
+        return self.state[4]
+
+    @property
+    def evaluation(self) -> float:
+        """Evaluation of the position just before the move is played."""
+        return self.state[5]
+
+    @property
+    def distance(self) -> float:
+        """Distance the piece moving travels."""
+        # Calculated when first needed, since most moves are never played
+        try:
+            return self._distance
+        except AttributeError:
+            self._distance = math.hypot(self.nx - self.x, self.ny - self.y)
+            return self._distance
+
     def __str__(self) -> str:
         return self.name
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, tuple):
-            return (self.x, self.y, self.nx, self.ny)[:len(other)] == other
-        return self.name == str(other)
+        # Moves are equal to moves with the same coordinates and name, and
+        # to tuples of their coordinates, so equal objects hash the same
+        if other.__class__ is Move:
+            return (self.x == other.x and self.y == other.y and
+                    self.nx == other.nx and self.ny == other.ny and
+                    self.name == other.name)
+        if isinstance(other, tuple) and len(other) == 4:
+            # Compare coordinates without building a tuple
+            return (self.x == other[0] and self.y == other[1] and
+                    self.nx == other[2] and self.ny == other[3])
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Hash the coordinates, since the name changes after the move is
+        # created to disambiguate it and to add check or checkmate
+        return hash((self.x, self.y, self.nx, self.ny))
@@ -1,6 +1,10 @@
 """Piece class."""
 
-PIECES = {
+from functools import lru_cache
+from types import MappingProxyType
+
+# Read-only, since pieces are shared and built from this when first used
+PIECES = MappingProxyType({
     # Letter: (name, value, movement)
 
     # Standard pieces
@@ -87,13 +91,101 @@ PIECES = {
     # Other
     ' ': ('empty', 0, ()),
     '?': ('unknown', 0, ())
-}
+})
+
+
+def piece_info(letter: str) -> tuple:
+    """
+    Return colour, name, value and movement of the piece of a letter.
+
+    Parameters
+    ----------
+    letter : str
+        Letter of piece.
+
+    Returns
+    -------
+    tuple of (str, str, float, tuple)
+        Colour, name, value and movement of the piece.
+    """
+    if letter in {'X', 'x'}:
+        colour = ''
+    elif letter in {'\u0398', '\u03B8'}:
+        letter = '\u0398'
+        colour = ''
+    elif letter.isupper():
+        colour = 'w'
+    elif letter.islower():
+        colour = 'b'
+        letter = letter.upper()
+    else:
+        colour = ''
+
+    return (colour, *PIECES.get(letter, PIECES['?']))
+
+
+@lru_cache(maxsize=None)
+def movement_offsets(movement: tuple) -> tuple:
+    """
+    Return every direction of a movement rotated and reflected.
+
+    Cached, so pieces with the same movement, such as both colours of
+    a piece, share their offsets.
+
+    Parameters
+    ----------
+    movement : tuple of tuple of (int, int, float)
+        Movement of a piece.
+
+    Returns
+    -------
+    tuple of tuple of (int, int, float)
+        Change in x, change in y and range of each direction the piece
+        can move in.
+    """
+    offsets = []
+    for move_x, move_y, maximum in movement:
+        # Rotate/reflect the movement vector in all 8 directions
+        for direction in range(8):
+            if direction % 2:
+                if move_x == move_y:
+                    continue
+                dx = move_y
+                dy = move_x
+            else:
+                dx = move_x
+                dy = move_y
+            if direction // 2 % 2:
+                if not dy:
+                    continue
+                dy *= -1
+            if direction // 4 % 2:
+                if not dx:
+                    continue
+                dx *= -1
+            offsets.append((dx, dy, maximum))
+    return tuple(offsets)
+
+
+# Colour, name, value and movement of the pieces of each letter, with other
+# letters added when first used
+PIECE_TABLE = {letter: piece_info(letter)
+               for piece in PIECES for letter in (piece, piece.lower())}
+
+# Unicode symbol of each standard piece
+SYMBOLS = {letter: chr(9812 + i) for i, letter in enumerate('KQRBNPkqrbnp')}
+
+# Piece of each letter, shared by every square holding that piece
+SHARED_PIECES = {}
 
 
 class Piece:
     """
     Piece class.
 
+    Pieces are immutable and shared, so only one piece of each letter
+    is ever created.
+
     Attributes
     ----------
     name : str
@@ -104,6 +196,12 @@ class Piece:
         Single letter to identify the piece, usually the initial of the
         name. Capital letter for white pieces, lowercase letter for
         black pieces, space for 'empty' piece.
+    notation : str
+        Letter of the piece in algebraic notation, the uppercase of
+        `letter`.
+    symbol : str
+        Unicode symbol of the piece if it is a standard piece, else
+        `letter`.
     movement : tuple of tuple of (int, int, float)
         Directions the piece can move in. The three elements of each
         inner tuple represent movement in one direction, movement in a
@@ -115,52 +213,53 @@ class Piece:
         have a range of 0.1, 0.4, or 0.5. 0.1 represents must capture,
         0.4 represents must not be obstructed, 0.5 represents can move
         or capture, in the direction the tuple represents.
+    offsets : tuple of tuple of (int, int, float)
+        Change in x, change in y and range of every direction the piece
+        can move in, found from `movement` by rotating and reflecting
+        each direction.
     value : float
         Relative piece value compared to the pawn, based off of 4-player
         chess.
-    moves : int
-        Number of moves played with this piece.
-    distance : float
-        Total distance travelled in squares by this piece.
     """
-    def __init__(self, letter: str = ' '):
+    __slots__ = (
+        'name', 'colour', 'letter', 'notation', 'symbol', 'movement',
+        'offsets', 'value'
+    )
+
+    def __new__(cls, letter: str = ' '):
         """
-        Initiate piece attributes.
+        Return the piece of a letter, creating it if first used.
 
         Parameters
         ----------
         letter : str
             Letter of piece.
         """
-        self.letter = letter
-
-        if letter in {'X', 'x'}:
-            self.colour = ''
-        elif letter in {'\u0398', '\u03B8'}:
-            letter = '\u0398'
-            self.colour = ''
-        elif letter.isupper():
-            self.colour = 'w'
-        elif letter.islower():
-            self.colour = 'b'
-            letter = letter.upper()
-        else:
-            self.colour = ''
-
-        self.name, self.value, self.movement = PIECES.get(letter, PIECES['?'])
-        self.moves = 0
-        self.distance = 0
+        self = SHARED_PIECES.get(letter)
+        if self is None:
+            self = SHARED_PIECES[letter] = super().__new__(cls)
+            self.letter = letter
+            self.notation = letter.upper()
+            self.symbol = SYMBOLS.get(letter, letter)
+            info = PIECE_TABLE.get(letter)
+            if info is None:
+                info = PIECE_TABLE[letter] = piece_info(letter)
+            self.colour, self.name, self.value, self.movement = info
+            self.offsets = movement_offsets(self.movement)
+        return self
 
     def __bool__(self) -> bool:
         return self.letter != ' '
 
     def __str__(self) -> str:
         """Return Unicode symbol if standard piece else self.letter."""
-        if self.letter in 'KQRBNPkqrbnp':
-            return chr(9812 + 'KQRBNPkqrbnp'.index(self.letter))
-        return self.letter
+        return self.symbol
 
     def __eq__(self, other) -> bool:
         if isinstance(other, Piece):
             return self.letter == other.letter
         return False
+
+
+# Piece of every empty square
+EMPTY_PIECE = Piece()